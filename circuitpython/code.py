@@ -2,7 +2,10 @@
     @Author: MCHilli   <https://github.com/mchilli>
 """
 
-import json
+try:
+    import ujson as json
+except ImportError:
+    import json
 import time
 
 import displayio
@@ -12,18 +15,34 @@ import supervisor
 import usb_cdc
 
 from adafruit_bitmap_font.bitmap_font import load_font
-from adafruit_display_text.label import Label
+from adafruit_display_text.bitmap_label import Label
 from adafruit_macropad import MacroPad
 from adafruit_hid.consumer_control_code import ConsumerControlCode
 from adafruit_hid.mouse import Mouse
 
 from utils.devices import Encoder, Key
 from utils.system import System
+from utils.utils import load_json
 
 supervisor.runtime.autoreload = False
+json.dumps(None) # warm up the json module, subsequent loads are noticeably faster
 
 SETTINGSFILE = "settings.json" # The file in which the settings are saved
 MACROFILE = "macros.json" # The file in which the macros are saved
+EMPTY = {} # Shared empty dict for missing optional entries, never modify it
+RESPONSES = { # Fixed serial responses, already json encoded with line ending
+    "settings_set": b'{"ACK":"Settings are set"}\n',
+    "settings_readonly": b'{"ERR":"Cannot set settings because USB storage is enabled"}\n',
+    "macros_received": b'{"ACK":"Macros received"}\n',
+    "macros_stored": b'{"ACK":"Macros stored"}\n',
+    "macros_readonly": b'{"ERR":"Cannot store macros because USB storage is enabled"}\n',
+    "enable_usb": b'{"ACK":"Enable USB"}\n',
+    "soft_reset": b'{"ACK":"Softreset"}\n',
+    "hard_reset": b'{"ACK":"Hardreset"}\n'
+}
+RX_BUFFER_SIZE = 512 # Size of the serial receive buffer, it only grows temporarily for bigger commands
+PEEK_SIZE = 64 # Commands up to this length are peeked, longer ones always carry content
+CONTENT_COMMANDS = ("set_settings", "set_macros") # Serial commands which need the parsed payload
 
 SETTINGS = {
     "sleeptime": 2, # Time in seconds until the display turns off
@@ -33,51 +52,16 @@ SETTINGS = {
     "brightness": 0.1 # Set the LCD and LED Brightness
 }
 
-try:
-    with open(SETTINGSFILE, "r") as f:
-        settings = json.load(f)
-        for key in SETTINGS:
-            if key in settings:
-                SETTINGS[key] = settings[key]
-except Exception:
-    pass
-
-if SETTINGS["keyboardlayout"] == "br":
-    from adafruit_hid.keyboard_layout_win_br import KeyboardLayout
-    from adafruit_hid.keycode_win_br import Keycode
-elif SETTINGS["keyboardlayout"] == "cz":
-    from adafruit_hid.keyboard_layout_win_cz import KeyboardLayout
-    from adafruit_hid.keycode_win_cz import Keycode
-elif SETTINGS["keyboardlayout"] == "da":
-    from adafruit_hid.keyboard_layout_win_da import KeyboardLayout
-    from adafruit_hid.keycode_win_da import Keycode
-elif SETTINGS["keyboardlayout"] == "de":
-    from adafruit_hid.keyboard_layout_win_de import KeyboardLayout
-    from adafruit_hid.keycode_win_de import Keycode
-elif SETTINGS["keyboardlayout"] == "es":
-    from adafruit_hid.keyboard_layout_win_es import KeyboardLayout
-    from adafruit_hid.keycode_win_es import Keycode
-elif SETTINGS["keyboardlayout"] == "fr":
-    from adafruit_hid.keyboard_layout_win_fr import KeyboardLayout
-    from adafruit_hid.keycode_win_fr import Keycode
-elif SETTINGS["keyboardlayout"] == "hu":
-    from adafruit_hid.keyboard_layout_win_hu import KeyboardLayout
-    from adafruit_hid.keycode_win_hu import Keycode
-elif SETTINGS["keyboardlayout"] == "it":
-    from adafruit_hid.keyboard_layout_win_it import KeyboardLayout
-    from adafruit_hid.keycode_win_it import Keycode
-elif SETTINGS["keyboardlayout"] == "po":
-    from adafruit_hid.keyboard_layout_win_po import KeyboardLayout
-    from adafruit_hid.keycode_win_po import Keycode
-elif SETTINGS["keyboardlayout"] == "sw":
-    from adafruit_hid.keyboard_layout_win_sw import KeyboardLayout
-    from adafruit_hid.keycode_win_sw import Keycode
-elif SETTINGS["keyboardlayout"] == "tr":
-    from adafruit_hid.keyboard_layout_win_tr import KeyboardLayout
-    from adafruit_hid.keycode_win_tr import Keycode
-elif SETTINGS["keyboardlayout"] == "uk":
-    from adafruit_hid.keyboard_layout_win_uk import KeyboardLayout
-    from adafruit_hid.keycode_win_uk import Keycode
+settings = load_json(SETTINGSFILE, EMPTY)
+if not isinstance(settings, dict):
+    settings = EMPTY
+for key in SETTINGS:
+    if key in settings:
+        SETTINGS[key] = settings[key]
+
+if SETTINGS["keyboardlayout"] in ("br", "cz", "da", "de", "es", "fr", "hu", "it", "po", "sw", "tr", "uk"):
+    KeyboardLayout = __import__("adafruit_hid.keyboard_layout_win_%s" % SETTINGS["keyboardlayout"], None, None, ("KeyboardLayout",)).KeyboardLayout
+    Keycode = __import__("adafruit_hid.keycode_win_%s" % SETTINGS["keyboardlayout"], None, None, ("Keycode",)).Keycode
 else:
     from adafruit_hid.keyboard_layout_us import KeyboardLayout
     from adafruit_hid.keycode import Keycode
@@ -95,14 +79,37 @@ class MacroApp():
         self.macropad.pixels.auto_write = False
         self.macropad.pixels.brightness = SETTINGS["brightness"]
 
+        self._hid_bound = False
+
         self.readonly = storage.getmount('/').readonly
         self.serial_data = usb_cdc.data
         self.serial_last_state = False
+        self._rx_buf = bytearray(RX_BUFFER_SIZE)
+        self._rx_view = memoryview(self._rx_buf)
+        self._reset_serial_buffer()
+        self._dirty = True
+        self._compiled_macros = {}
 
         self.macroStack = [self._init_macros()]
+        self.font = load_font("/fonts/6x12.pcf") if SETTINGS["useunicodefont"] else terminalio.FONT
         self.keys = self._init_keys()
         self.group_label = self._init_group_label()
         self.encoder = Encoder(self.macropad)
+        self._key_funcs = {
+            "blank": None,
+            "group": self.open_group,
+            "macro": self.run_macro
+        }
+        self._serial_commands = {
+            "get_settings": self._cmd_get_settings,
+            "set_settings": self._cmd_set_settings,
+            "get_macros": self._cmd_get_macros,
+            "set_macros": self._cmd_set_macros,
+            "save_macros": self._cmd_save_macros,
+            "enable_usb": self._cmd_enable_usb,
+            "soft_reset": self._cmd_soft_reset,
+            "hard_reset": self._cmd_hard_reset
+        }
 
         self._init_group()
 
@@ -121,21 +128,13 @@ class MacroApp():
         Returns:
             dict: the json file as dict
         """
-        rootLabel = "Macros"
-        try:
-            with open(MACROFILE, "r") as f:
-                macros = json.load(f)
-                if isinstance(macros, list):
-                    return {
-                        "label": rootLabel, 
-                        "content": macros,
-                    }
-                return macros
-        except OSError:
+        macros = load_json(MACROFILE, [])
+        if isinstance(macros, list):
             return {
-                "label": rootLabel, 
-                "content": [],
+                "label": "Macros",
+                "content": macros,
             }
+        return macros
         
     def _save_macros(self) -> None:
         """ store the macros in the macrofile
@@ -148,7 +147,7 @@ class MacroApp():
 
     def _init_group_label(self) -> dict[str, Key]:
         group_label = Label(
-                    font=load_font("/fonts/6x12.pcf") if SETTINGS["useunicodefont"] else terminalio.FONT,
+                    font=self.font,
                     text="",
                     padding_top=0,
                     padding_bottom=0,
@@ -170,10 +169,12 @@ class MacroApp():
             list[Key]: a list of Keys
         """
         keys = []
+        column_width = (self.macropad.display.width - 2) // 2
+        height = self.macropad.display.height
 
         for i in range(self.macropad.keys.key_count):
             label = Label(
-                    font=load_font("/fonts/6x12.pcf") if SETTINGS["useunicodefont"] else terminalio.FONT,
+                    font=self.font,
                     text="",
                     padding_top=0,
                     padding_bottom=1,
@@ -181,8 +182,8 @@ class MacroApp():
                     padding_right=4,
                     color=0xFFFFFF,
                     anchored_position=(
-                        (self.macropad.display.width - 2) / 2 * (i % 3) + 1,
-                        self.macropad.display.height / 5 * (i // 3) + 2),
+                        column_width * (i % 3) + 1,
+                        height * (i // 3) // 5 + 2),
                     anchor_point=((i % 3) / 2, 0.0)
                 )
             
@@ -194,12 +195,53 @@ class MacroApp():
     def _init_group(self) -> None:
         """ initiate the group content
         """
+        self._current_group = self.macroStack[-1]
+
         self._update_encoder_macros()
 
         self._update_tab()
 
     def run_macro(self, item:dict, *args) -> None:
-        """ run the macro, can be:
+        """ run the macro, the content is compiled on the first run and cached
+
+        Args:
+            item (dict): the macro item containing data
+        """
+        content = item["content"]
+        steps = self._compiled_macros.get(id(content))
+        if steps is None:
+            self._bind_hid()
+            steps = self._compiled_macros[id(content)] = self._compile_macro(content)
+
+        for func, args in steps:
+            func(*args)
+
+        self._kb_release_all()
+        self._mouse_release_all()
+
+    def _bind_hid(self) -> None:
+        """ bind the HID device methods once, the devices are created lazily by the
+            MacroPad on first access, which fails if no USB host is connected
+        """
+        if self._hid_bound:
+            return
+
+        keyboard = self.macropad.keyboard
+        self._kb_press = keyboard.press
+        self._kb_release = keyboard.release
+        self._kb_release_all = keyboard.release_all
+        self._kb_write = self.macropad.keyboard_layout.write
+        mouse = self.macropad.mouse
+        self._mouse_move = mouse.move
+        self._mouse_click = mouse.click
+        self._mouse_release_all = mouse.release_all
+        consumer_control = self.macropad.consumer_control
+        self._cc_press = consumer_control.press
+        self._cc_release = consumer_control.release
+        self._hid_bound = True
+
+    def _compile_macro(self, content:list) -> list[tuple]:
+        """ resolve the macro content into steps, the content can be:
                 Float (e.g. 0.25): delay in seconds
                 String (e.g. "Foo"): corresponding keys pressed & released
                 Dict {}: 
@@ -213,45 +255,48 @@ class MacroApp():
                     'sys': System Class Methodname
 
         Args:
-            item (dict): the macro item containing data
+            content (list): the macro content
+
+        Returns:
+            list[tuple]: the steps as (function, arguments) tuples
         """
-        for key in item["content"]:
+        steps = []
+        for key in content:
             if isinstance(key, float):
-                time.sleep(key)
+                steps.append((time.sleep, (key,)))
             elif isinstance(key, str):
-                self.macropad.keyboard_layout.write(key)
+                steps.append((self._kb_write, (key,)))
             elif isinstance(key, dict):
                 if 'kc' in key:
-                    key_name = key['kc'][1:] if key['kc'][:1] == "-" else key['kc']
+                    release = key['kc'][:1] == "-"
+                    key_name = key['kc'][1:] if release else key['kc']
                     key_code = getattr(Keycode, key_name.upper(), None)
                     if key_code:
-                        if key['kc'][:1] != "-" :
-                            self.macropad.keyboard.press(key_code)
-                        else:
-                            self.macropad.keyboard.release(key_code)
+                        steps.append((self._kb_release if release else self._kb_press, (key_code,)))
                 if 'ccc' in key:
                     control_code = getattr(ConsumerControlCode, key['ccc'].upper(), None)
                     if control_code:
-                        self.macropad.consumer_control.press(control_code)
-                        self.macropad.consumer_control.release()
+                        steps.append((self._cc_press, (control_code,)))
+                        steps.append((self._cc_release, ()))
                 if 'tone' in key:
-                    self.macropad.play_tone(key['tone']['frequency'], key['tone']['duration'])
+                    steps.append((self.macropad.play_tone, (key['tone']['frequency'], key['tone']['duration'])))
                 if 'mse' in key:
                     if "b" in key["mse"]:
                         btn = getattr(Mouse, f"{key['mse']['b'].upper()}_BUTTON", None)
                         if btn:
-                            self.macropad.mouse.click(btn)
-                    self.macropad.mouse.move(
+                            steps.append((self._mouse_click, (btn,)))
+                    movement = (
                         key["mse"].get('x', 0),
                         key["mse"].get('y', 0),
                         key["mse"].get('w', 0))
+                    if any(movement):
+                        steps.append((self._mouse_move, movement))
                 if 'sys' in key:
                     method = getattr(System, key['sys'], None)
                     if method:
-                        method(self)
-        
-        self.macropad.keyboard.release_all()
-        self.macropad.mouse.release_all()
+                        steps.append((method, (self,)))
+
+        return steps
 
     def open_group(self, item:dict, *args) -> None:
         """ open a group
@@ -279,194 +324,368 @@ class MacroApp():
     def _update_tab(self) -> None:
         """ update the current displayed group tab 
         """
-        for key in self.keys:
-            key.clear_props()
+        group = self._current_group
+        content = group["content"]
+        content_count = len(content)
+        key_funcs = self._key_funcs
 
-        for i, item in enumerate(self.macroStack[-1]["content"][:self.macropad.keys.key_count]):
-            self.keys[i].type = item["type"]
-            self.keys[i].label = "" if item["type"] == "blank" else item["label"] 
-            self.keys[i].color = (0, 0, 0) if item["type"] == "blank" else item["color"]
-            self.keys[i].set_func(self._get_key_func(item["type"]), item)
+        for i, key in enumerate(self.keys):
+            if i >= content_count:
+                key.clear_props()
+                continue
 
-        self.group_label.text = self.macroStack[-1]["label"]
+            item = content[i]
+            type = item["type"]
+            key.type = type
+            key.label = "" if type == "blank" else item["label"]
+            key.color = (0, 0, 0) if type == "blank" else item["color"]
+            key.set_func(key_funcs.get(type, key_funcs["macro"]), item)
 
-        for key in self.keys:
-            key.update_colors()
-
-    def _get_key_func(self, type:str) -> function:
-        """ get the specific function for the type
-
-        Args:
-            type (str): the item type
+        if self.group_label.text != group["label"]:
+            self.group_label.text = group["label"]
 
-        Returns:
-            function: return the function for type
-        """
-        key_funcs = {
-            "blank": None,
-            "group": self.open_group
-        }
+        self._dirty = True
 
-        return key_funcs.get(type, self.run_macro)
+        changed = False
+        for key in self.keys:
+            changed = key.update_colors() or changed
+        if changed:
+            self.macropad.pixels.show()
 
     def _update_encoder_macros(self) -> None:
         """ update the rotary encoder macros defined for opened group
         """
+        encoder = self._current_group.get("encoder") or EMPTY
         self.encoder.update_encoder_macros(
-            on_switch = self.macroStack[-1].get("encoder", {}).get("switch"),
-            on_increased = self.macroStack[-1].get("encoder", {}).get("increased"),
-            on_decreased = self.macroStack[-1].get("encoder", {}).get("decreased")
+            on_switch = encoder.get("switch"),
+            on_increased = encoder.get("increased"),
+            on_decreased = encoder.get("decreased")
         )
 
-    def _handle_serial_data(self, payload:str) -> dict:
+    def _handle_serial_data(self, payload:memoryview) -> dict | bytes:
         """ handle the data comming over the serial connection
 
         Args:
-            payload (str): the data, as json string
+            payload (memoryview): the data, as json encoded bytes
 
         Returns:
-            dict: response, sended over the serial connection
+            dict | bytes: response, sended over the serial connection
         """
-        response = {}
         try:
+            if len(payload) <= PEEK_SIZE:
+                command = self._peek_command(bytes(payload))
+                if command in self._serial_commands and command not in CONTENT_COMMANDS:
+                    return self._serial_commands[command](EMPTY)
+
             payload = json.loads(payload)
 
-            if 'command' not in payload.keys():
-                response['ERR'] = 'Wrong payload: %s' % payload
-                return response
+            if 'command' not in payload:
+                return {'ERR': 'Wrong payload: %s' % payload}
 
-            command = payload['command']
+            handler = self._serial_commands.get(payload['command'])
+            if handler is None:
+                return {'ERR': 'Unkown command: %s' % payload['command']}
 
-            if command == 'get_settings':
-                response['ACK'] = 'settings'
-                response['CONTENT'] = SETTINGS
-                return response
-            
-            elif command == 'set_settings':
-                if 'content' not in payload.keys():
-                    response['ERR'] = 'No content: %s' % payload
-                    return response
-                
-                content = payload['content']
-
-                if self._save_settings(content):
-                    response['ACK'] = 'Settings are set'
-                else:
-                    response['ERR'] = 'Cannot set settings because USB storage is enabled'
-
-                return response
-
-            elif command == 'get_macros':
-                response['ACK'] = 'macros'
-                response['CONTENT'] = self.macroStack[0]
-                return response
-            
-            elif command == 'set_macros':
-                if 'content' not in payload.keys():
-                    response['ERR'] = 'No content: %s' % payload
-                    return response
-                
-                content = payload['content']
-                self.macroStack = [content]
-                self._display_on()
-                self._init_group()
+            return handler(payload)
+        except Exception as e:
+            return {'ERR': str(e)}
 
-                response['ACK'] = 'Macros received'
-                return response
-            
-            elif command == 'save_macros':
-                if self._save_macros():
-                    response['ACK'] = 'Macros stored'
-                else:
-                    response['ERR'] = 'Cannot store macros because USB storage is enabled'
+    def _peek_command(self, payload:bytes) -> str:
+        """ find the command in the raw payload without parsing the whole json, only a
+            "command" key of the top level object with a plain string value is accepted
 
-                return response
-            
-            elif command == 'enable_usb':
-                System.enable_usb()
+        Args:
+            payload (bytes): the data, as json encoded bytes
 
-                response['ACK'] = 'Enable USB'
-                return response
-            
-            elif command == 'soft_reset':
-                System.soft_reset()
+        Returns:
+            str: the command, None if it can't be found and the json must be parsed
+        """
+        payload = payload.strip()
+        if payload[:1] != b"{" or payload[-1:] != b"}":
+            return None
+
+        whitespace = (0x20, 0x09, 0x0A, 0x0D)
+        length = len(payload)
+        depth = 0
+        index = 0
+        while index < length:
+            char = payload[index]
+            if char == 0x22: # a string, skip it and check if it's the top level command key
+                start = index + 1
+                index = start
+                while index < length and payload[index] != 0x22:
+                    index += 2 if payload[index] == 0x5C else 1
+                if index >= length:
+                    return None
+                if depth == 1 and payload[start:index] == b"command":
+                    index += 1
+                    while index < length and payload[index] in whitespace:
+                        index += 1
+                    if index >= length or payload[index] != 0x3A:
+                        continue # it's a value, not a key
+                    index += 1
+                    while index < length and payload[index] in whitespace:
+                        index += 1
+                    if index >= length or payload[index] != 0x22:
+                        return None
+                    end = payload.find(b'"', index + 1)
+                    if end < 0 or 0x5C in payload[index + 1:end]:
+                        return None
+                    after = end + 1
+                    while after < length and payload[after] in whitespace:
+                        after += 1
+                    if after >= length or payload[after] not in (0x2C, 0x7D):
+                        return None
+                    return payload[index + 1:end].decode("utf-8")
+            elif char in (0x7B, 0x5B): # { [
+                depth += 1
+            elif char in (0x7D, 0x5D): # } ]
+                depth -= 1
+            index += 1
+        return None
+
+    def _cmd_get_settings(self, payload:dict) -> dict | bytes:
+        """ serial command: send the current settings
 
-                response['ACK'] = 'Softreset'
-                return response
-            
-            elif command == 'hard_reset':
-                System.hard_reset()
+        Args:
+            payload (dict): the parsed serial data
 
-                response['ACK'] = 'Hardreset'
-                return response
-            
-            else:
-                response['ERR'] = 'Unkown command: %s' % command
-                return response
-        except Exception as e:
-            response['ERR'] = str(e)
-            return response
+        Returns:
+            dict | bytes: response, sended over the serial connection
+        """
+        return {'ACK': 'settings', 'CONTENT': SETTINGS}
+
+    def _cmd_set_settings(self, payload:dict) -> dict | bytes:
+        """ serial command: store the received settings
+
+        Args:
+            payload (dict): the parsed serial data
+
+        Returns:
+            dict | bytes: response, sended over the serial connection
+        """
+        if 'content' not in payload:
+            return {'ERR': 'No content: %s' % payload}
 
-    def _send_serial_data(self, payload:dict) -> None:
+        if self._save_settings(payload['content']):
+            return RESPONSES['settings_set']
+        return RESPONSES['settings_readonly']
+
+    def _cmd_get_macros(self, payload:dict) -> dict | bytes:
+        """ serial command: send the current macros
+
+        Args:
+            payload (dict): the parsed serial data
+
+        Returns:
+            dict | bytes: response, sended over the serial connection
+        """
+        return {'ACK': 'macros', 'CONTENT': self.macroStack[0]}
+
+    def _cmd_set_macros(self, payload:dict) -> dict | bytes:
+        """ serial command: replace the macros with the received ones
+
+        Args:
+            payload (dict): the parsed serial data
+
+        Returns:
+            dict | bytes: response, sended over the serial connection
+        """
+        if 'content' not in payload:
+            return {'ERR': 'No content: %s' % payload}
+
+        self.macroStack = [payload['content']]
+        self._compiled_macros = {}
+        self._display_on()
+        self._init_group()
+
+        return RESPONSES['macros_received']
+
+    def _cmd_save_macros(self, payload:dict) -> dict | bytes:
+        """ serial command: store the current macros in the macrofile
+
+        Args:
+            payload (dict): the parsed serial data
+
+        Returns:
+            dict | bytes: response, sended over the serial connection
+        """
+        if self._save_macros():
+            return RESPONSES['macros_stored']
+        return RESPONSES['macros_readonly']
+
+    def _cmd_enable_usb(self, payload:dict) -> dict | bytes:
+        """ serial command: enable the usb storage
+
+        Args:
+            payload (dict): the parsed serial data
+
+        Returns:
+            dict | bytes: response, sended over the serial connection
+        """
+        System.enable_usb()
+        return RESPONSES['enable_usb']
+
+    def _cmd_soft_reset(self, payload:dict) -> dict | bytes:
+        """ serial command: soft reset the device
+
+        Args:
+            payload (dict): the parsed serial data
+
+        Returns:
+            dict | bytes: response, sended over the serial connection
+        """
+        System.soft_reset()
+        return RESPONSES['soft_reset']
+
+    def _cmd_hard_reset(self, payload:dict) -> dict | bytes:
+        """ serial command: hard reset the device
+
+        Args:
+            payload (dict): the parsed serial data
+
+        Returns:
+            dict | bytes: response, sended over the serial connection
+        """
+        System.hard_reset()
+        return RESPONSES['hard_reset']
+
+    def _reset_serial_buffer(self) -> None:
+        """ drop all received data and return to the default receive buffer size
+        """
+        if len(self._rx_buf) != RX_BUFFER_SIZE:
+            self._rx_buf = bytearray(RX_BUFFER_SIZE)
+            self._rx_view = memoryview(self._rx_buf)
+        self._rx_size = 0
+        self._rx_scanned = 0
+        self._rx_line = 0
+
+    def _drop_serial_line(self) -> None:
+        """ remove the last returned line from the receive buffer and move the remaining
+            data to the front, an enlarged buffer shrinks back once the remaining data fits
+        """
+        if not self._rx_line:
+            return
+
+        rest = self._rx_size - self._rx_line
+        if len(self._rx_buf) > RX_BUFFER_SIZE and rest <= RX_BUFFER_SIZE:
+            rx_buf = bytearray(RX_BUFFER_SIZE)
+            rx_buf[:rest] = self._rx_view[self._rx_line:self._rx_size]
+            self._rx_buf = rx_buf
+            self._rx_view = memoryview(rx_buf)
+        elif rest:
+            self._rx_view[:rest] = self._rx_view[self._rx_line:self._rx_size]
+
+        self._rx_size = rest
+        self._rx_scanned = 0
+        self._rx_line = 0
+
+    def _read_serial_data(self, waiting:int) -> memoryview:
+        """ read the waiting data into the receive buffer, which grows if a line doesn't fit,
+            and get the next complete line. The line points into the receive buffer and is
+            only valid until the next call.
+
+        Args:
+            waiting (int): number of bytes waiting on the serial connection
+
+        Returns:
+            memoryview: the next line without the line ending, None if no line is complete
+        """
+        self._drop_serial_line()
+
+        if waiting > 0:
+            size = self._rx_size + waiting
+            if size > len(self._rx_buf):
+                rx_buf = bytearray(max(size, 2 * len(self._rx_buf)))
+                rx_buf[:self._rx_size] = self._rx_view[:self._rx_size]
+                self._rx_buf = rx_buf
+                self._rx_view = memoryview(rx_buf)
+
+            self._rx_size += self.serial_data.readinto(self._rx_view[self._rx_size:size]) or 0
+
+        rx_buf = self._rx_buf
+        for end in range(self._rx_scanned, self._rx_size):
+            if rx_buf[end] == 0x0A:
+                self._rx_line = end + 1
+                return self._rx_view[:end]
+        self._rx_scanned = self._rx_size
+        return None
+
+    def _send_serial_data(self, payload:dict | bytes) -> None:
         """ prepare and send data over serial connection
 
         Args:
-            payload (dict): the data
+            payload (dict | bytes): the data, bytes are sent as they are (see RESPONSES)
         """
-        payloads = '%s\n' % json.dumps(payload, separators=(',', ':'))
-        self.serial_data.write(bytearray(payloads.encode()))
+        if isinstance(payload, bytes):
+            self.serial_data.write(payload)
+            return
+        self.serial_data.write(json.dumps(payload, separators=(',', ':')).encode())
+        self.serial_data.write(b'\n')
 
-    def _display_on(self) -> None:
+    def _display_on(self, now:float = None) -> None:
         """ Turn on the display if it's in sleep mode and reset the sleep timer.
+
+        Args:
+            now (float, optional): the current monotonic time, if already known. Defaults to None.
         """
         if self.macropad.display_sleep:
             self.macropad.display_sleep = False
-        self.sleep_timer = time.monotonic()
+            self._dirty = True
+        self.sleep_timer = time.monotonic() if now is None else now
 
     def start(self) -> None:
         """ Start the Mainloop
         """
-        self.sleep_timer = time.monotonic()
+        macropad = self.macropad
+        display = macropad.display
+        events = macropad.keys.events
+        serial_data = self.serial_data
+        encoder = self.encoder
+        keys = self.keys
+        sleeptime = SETTINGS["sleeptime"]
+        monotonic = time.monotonic
+
+        self.sleep_timer = monotonic()
         while True:
-            if not self.macropad.display_sleep and time.monotonic() - self.sleep_timer > SETTINGS["sleeptime"]:
-                self.macropad.display_sleep = True
+            now = monotonic()
+            if not macropad.display_sleep and now - self.sleep_timer > sleeptime:
+                macropad.display_sleep = True
 
-            self.macropad.display.refresh()
+            if self._dirty and not macropad.display_sleep:
+                display.refresh()
+                self._dirty = False
 
             # send after the connection is established
-            if self.serial_last_state != self.serial_data.connected:
-                self.serial_last_state = self.serial_data.connected
-                if self.serial_data.connected:
+            connected = serial_data.connected
+            if self.serial_last_state != connected:
+                self.serial_last_state = connected
+                self._reset_serial_buffer()
+                if connected:
                     self._send_serial_data({'ACK': 'usbenabled', 'CONTENT': self.readonly })
 
-            if self.serial_data.connected:
-                if self.serial_data.in_waiting > 0:
-                    data = self.serial_data.readline()
-                    self._send_serial_data(self._handle_serial_data(data.decode("utf-8").strip()))
+            if connected:
+                waiting = serial_data.in_waiting
+                if waiting > 0 or self._rx_size:
+                    data = self._read_serial_data(waiting)
+                    if data:
+                        self._send_serial_data(self._handle_serial_data(data))
 
                 # get key events, so no inputs will be stored during connection
-                # self.macropad.keys.events.get()
+                # events.get()
                 # continue
 
-            key_event = self.macropad.keys.events.get()
+            key_event = events.get()
             if key_event:
-                self._display_on()
-                self.keys[key_event.key_number].pressed = True if key_event.pressed and not any([key.pressed for key in self.keys]) else False
+                self._display_on(now)
+                keys[key_event.key_number].pressed = key_event.pressed and Key.pressed_count == 0
 
-            if self.encoder.switch and self.encoder.on_switch:
-                self._display_on()
-                self.run_macro({
-                    "content": self.encoder.on_switch
-                })
-            if self.encoder.increased and self.encoder.on_increased:
-                self._display_on()
-                self.run_macro({
-                    "content": self.encoder.on_increased
-                })
-            if self.encoder.decreased and self.encoder.on_decreased:
+            encoder_macro = encoder.poll()
+            if encoder_macro:
+                # read the clock again, a macro run by a key event above may have blocked
                 self._display_on()
                 self.run_macro({
-                    "content": self.encoder.on_decreased
+                    "content": encoder_macro
                 })
 
 app = MacroApp()
@@ -1,5 +1,5 @@
 from adafruit_macropad import MacroPad
-from adafruit_display_text.label import Label
+from adafruit_display_text.bitmap_label import Label
 
 from utils.utils import center
 
@@ -13,29 +13,10 @@ class Encoder():
     
     @property
     def switch(self) -> bool:
-        return self.switch_debounced
+        switch = self._macropad.encoder_switch_debounced
+        switch.update()
+        return switch.pressed
 
-    @property
-    def switch_debounced(self) -> bool:
-        self._macropad.encoder_switch_debounced.update()
-        return self._macropad.encoder_switch_debounced.pressed
-
-    @property
-    def increased(self) -> bool:
-        postion = self._macropad.encoder
-        if postion > self._last_position:
-            self._last_position = postion
-            return True
-        return False
-    
-    @property
-    def decreased(self) -> bool:
-        postion = self._macropad.encoder
-        if postion < self._last_position:
-            self._last_position = postion
-            return True
-        return False
-    
     @property
     def on_switch(self) -> None:
         return self._on_switch
@@ -48,6 +29,32 @@ class Encoder():
     def on_decreased(self) -> None:
         return self._on_decreased
     
+    def poll(self) -> list:
+        """ poll the encoder and get the macro of the triggered action
+
+        Returns:
+            list: the macro content of the triggered action, None if nothing triggered
+        """
+        if self.switch and self._on_switch:
+            return self._on_switch
+        delta = self.poll_delta()
+        if delta > 0:
+            return self._on_increased
+        if delta < 0:
+            return self._on_decreased
+        return None
+
+    def poll_delta(self) -> int:
+        """ read the encoder position once and get the change since the last read
+
+        Returns:
+            int: positive if increased, negative if decreased, 0 if unchanged
+        """
+        position = self._macropad.encoder
+        delta = position - self._last_position
+        self._last_position = position
+        return delta
+
     def update_encoder_macros(self, on_switch:function=None, on_increased:function=None, on_decreased:function=None) -> None:
         self._on_switch = on_switch
         self._on_increased = on_increased
@@ -56,11 +63,16 @@ class Encoder():
 
 class Key():
     """ Handles a single key """
+    pressed_count = 0 # number of keys currently pressed, shared by all keys
+
     def __init__(self, macropad:MacroPad, index:int, label:Label) -> None:
         self._macropad = macropad
         self._index = index
         self._pressed = False
         self._label = label
+        self._text = None
+        self._inverted = None
+        self._led_color = None
 
         self.clear_props()
     
@@ -72,6 +84,8 @@ class Key():
     
     @pressed.setter
     def pressed(self, pressed:bool) -> None:
+        if pressed != self._pressed:
+            Key.pressed_count += 1 if pressed else -1
         self._pressed = pressed
         self._on_pressed() if self.pressed else self._on_released()
 
@@ -83,7 +97,7 @@ class Key():
     
     @label.setter
     def label(self, label:str) -> None:
-        self._label.text = center(label, 6, ' ') if len(label) <= 6 else label[:6]
+        self._set_text(center(label, 6, ' ') if len(label) <= 6 else label[:6])
 
     @property
     def type(self) -> str:
@@ -105,31 +119,53 @@ class Key():
     def color(self, color:tuple) -> None:
         self._color = color
     
-    def update_colors(self) -> None:
-        """ update the backgroundcolor and color based on type
+    def update_colors(self) -> bool:
+        """ update the backgroundcolor and color based on type, the led color is
+            only buffered and must be shown afterwards
+
+        Returns:
+            bool: True if the led color has changed
         """
-        if self.type in ["blank", "group"]:
-            self._label.background_color = 0x000000
-            self._label.color = 0xffffff
-        else:
-            self._label.background_color = 0xffffff
-            self._label.color = 0x000000
+        inverted = self.type not in ("blank", "group")
+        if inverted != self._inverted:
+            self._inverted = inverted
+            self._label.background_color = 0xffffff if inverted else 0x000000
+            self._label.color = 0x000000 if inverted else 0xffffff
 
-        self._set_led(self.color)
+        return self._set_led(self.color, show=False)
 
-    def _set_led(self, color:tuple(int, int, int)) -> None:
-        """ set and update the led color
+    def _set_text(self, text:str) -> None:
+        """ set the label text, skipped if it is already shown so the display is not invalidated
+
+        Args:
+            text (str): the label text
+        """
+        if text != self._text:
+            self._text = text
+            self._label.text = text
+
+    def _set_led(self, color:tuple(int, int, int), show:bool = True) -> bool:
+        """ set and update the led color, skipped if the led has this color already
 
         Args:
             color (tuple): the led color (R, G, B)
+            show (bool, optional): show the pixels immediately. Defaults to True.
+
+        Returns:
+            bool: True if the led color has changed
         """
+        if color == self._led_color:
+            return False
+        self._led_color = color
         self._macropad.pixels[self._index] = color
-        self._macropad.pixels.show()
+        if show:
+            self._macropad.pixels.show()
+        return True
 
     def clear_props(self) -> None:
         """ clear all properties so the key is off
         """
-        self._label.text = ""
+        self._set_text("")
         self._type = None
         self._color = (0, 0, 0)
         self._func = None
@@ -1,3 +1,9 @@
+import gc
+try:
+    import ujson as json
+except ImportError:
+    import json
+
 def to_chunks(lst, n):
     for i in range(0, len(lst), n):
         yield lst[i:i + n]
@@ -5,4 +11,21 @@ def to_chunks(lst, n):
 def center(string:str, width:int = 0, sep:str = ' '):
     left = (width - len(string)) // 2
     right = width - len(string) - left
-    return f"{sep * left}{string}{sep * right}"
\ No newline at end of file
+    return f"{sep * left}{string}{sep * right}"
+
+def load_json(path:str, default=None):
+    """ load a json file, with a collected heap so the parser has the most room
+
+    Args:
+        path (str): the path of the json file
+        default (optional): returned if the file is missing or invalid. Defaults to None.
+
+    Returns:
+        the parsed json content
+    """
+    try:
+        gc.collect()
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
\ No newline at end of file